@@ -6,7 +6,11 @@ EVA ROBOT - CAMERA MANAGER (USB via OpenCV, PiCam via Picamera2 se disponível)
 - Rotação aplicada SOMENTE na PiCam
 """
 
+import os
+import glob
 import time
+import fcntl
+import struct
 import threading
 from enum import Enum
 from typing import Optional, List, Tuple
@@ -14,6 +18,51 @@ from typing import Optional, List, Tuple
 import cv2
 import numpy as np
 
+# operações por frame são pequenas (rotate/flip/putText/imencode): o fork/join
+# do thread pool do OpenCV custa mais que o trabalho em si no Pi
+cv2.setUseOptimized(True)
+cv2.setNumThreads(1)
+
+
+# MJPEG para browser: 4:2:0 baseline é menor e decodifica mais rápido no cliente
+DEFAULT_JPEG_QUALITY = 60
+
+
+def _jpeg_params(quality: int) -> List[int]:
+    q = int(quality)
+    return [
+        cv2.IMWRITE_JPEG_QUALITY, q,
+        cv2.IMWRITE_JPEG_CHROMA_QUALITY, q,
+        cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+        cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+        cv2.IMWRITE_JPEG_PROGRESSIVE, 0,
+    ]
+
+
+# V4L2: _IOR('V', 0, struct v4l2_capability), struct com 104 bytes
+VIDIOC_QUERYCAP = 0x80685600
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+
+def _is_v4l2_capture(path: str) -> bool:
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return False
+    try:
+        buf = bytearray(104)
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, buf)
+        caps, device_caps = struct.unpack_from("II", buf, 84)
+        # device_caps descreve o nó (UVC expõe um nó extra só de metadata)
+        if caps & V4L2_CAP_DEVICE_CAPS:
+            caps = device_caps
+        return bool(caps & V4L2_CAP_VIDEO_CAPTURE)
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
 
 class CameraType(Enum):
     USB = "usb"
@@ -21,6 +70,12 @@ class CameraType(Enum):
 
 
 class CameraManager:
+    # tempo máximo de warmup / espera de device após switch
+    WARMUP_BUDGET_S = 0.3
+    # core fixo para a thread de captura (None = sem afinidade)
+    CAPTURE_CPU: Optional[int] = 0
+    READ_TIMEOUT_MS = 500
+
     def __init__(
         self,
         picam_id: int = 0,
@@ -42,11 +97,13 @@ class CameraManager:
 
         self.rotate_picam = bool(rotate_picam)
         self.picam_rotation = picam_rotation
+        # True quando a rotação já sai pronta do ISP (sem cv2.rotate por frame)
+        self._picam_isp_rotated = False
 
         self.flip_usb = bool(flip_usb)
         self.usb_flip_code = int(usb_flip_code)
 
-        self.active_camera_type = CameraType.USB
+        self._set_active_camera(CameraType.USB)
 
         # OpenCV capture (USB ou fallback)
         self.cap: Optional[cv2.VideoCapture] = None
@@ -61,24 +118,48 @@ class CameraManager:
         self.frame_lock = threading.Lock()
         self.cap_lock = threading.Lock()
 
+        # captura sob demanda: sem viewers o loop fica ocioso
+        self._viewers = 0
+        self._viewers_lock = threading.Lock()
+        # slot sempre com o frame mais novo; o seq evita re-encode do mesmo frame
+        self._frame_seq = 0
+        self._encoded = None  # (seq, quality, jpeg)
+
         self.running = False
+        self._stop_evt = threading.Event()
         self.switching = False
         self.thread: Optional[threading.Thread] = None
 
         print("📷 CameraManager inicializado")
 
+    def _set_active_camera(self, camera_type: CameraType):
+        self.active_camera_type = camera_type
+        # label do overlay calculado uma vez por troca, não por frame
+        self._active_label = camera_type.value.upper()
+
     # -------------------------
     # utils detect
     # -------------------------
     def _detect_opencv_devices(self, max_index: int = 6) -> List[int]:
+        # VIDIOC_QUERYCAP em vez de abrir um VideoCapture por índice
         found = []
-        for i in range(max_index):
-            cap = cv2.VideoCapture(i, cv2.CAP_V4L2)
-            ok = cap.isOpened()
-            cap.release()
-            if ok:
-                found.append(i)
-        return found
+        for path in glob.glob("/dev/video*"):
+            suffix = path[len("/dev/video"):]
+            if not suffix.isdigit() or int(suffix) >= max_index:
+                continue
+            if _is_v4l2_capture(path):
+                found.append(int(suffix))
+        return sorted(found)
+
+    def _wait_device(self, device_id: int) -> bool:
+        # release() já é síncrono (STREAMOFF); só espera se o nó ainda não existe
+        path = "/dev/video%d" % int(device_id)
+        deadline = time.monotonic() + self.WARMUP_BUDGET_S
+        while not os.path.exists(path):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
 
     def _open_opencv(self, device_id: int) -> bool:
         cap = cv2.VideoCapture(int(device_id), cv2.CAP_V4L2)
@@ -90,11 +171,16 @@ class CameraManager:
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
         cap.set(cv2.CAP_PROP_FPS, self.fps)
         cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-        # warmup
-        for _ in range(3):
-            cap.read()
-            time.sleep(0.02)
+        # read() não fica preso em select() se o USB for desconectado
+        if hasattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC"):
+            cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.READ_TIMEOUT_MS)
+
+        # warmup: lê até vir o primeiro frame válido (com orçamento máximo)
+        deadline = time.monotonic() + self.WARMUP_BUDGET_S
+        while time.monotonic() < deadline:
+            ok, _ = cap.read()
+            if ok:
+                break
 
         self.cap = cap
         return True
@@ -117,18 +203,33 @@ class CameraManager:
             if self.picam2 is None:
                 self.picam2 = Picamera2()
 
-            # configuração simples
+            # 180° = hflip+vflip: o ISP faz de graça; 90°/270° continuam no cv2.rotate
+            extra = {}
+            self._picam_isp_rotated = False
+            if self.rotate_picam and self.picam_rotation == cv2.ROTATE_180:
+                try:
+                    from libcamera import Transform
+                    extra["transform"] = Transform(hflip=1, vflip=1)
+                except Exception:
+                    pass
+
+            # configuração simples; no Picamera2 "RGB888" é armazenado como [B,G,R]
+            # por pixel, que já é a ordem do OpenCV (sem cvtColor por frame)
             cfg = self.picam2.create_video_configuration(
-                main={"size": (self.width, self.height), "format": "RGB888"}
+                main={"size": (self.width, self.height), "format": "RGB888"},
+                **extra
             )
             self.picam2.configure(cfg)
             self.picam2.start()
             self.picam2_started = True
+            # só agora a rotação do ISP está valendo
+            self._picam_isp_rotated = "transform" in extra
 
-            # warmup
-            for _ in range(3):
-                _ = self.picam2.capture_array()
-                time.sleep(0.02)
+            # warmup: capture_array bloqueia até o primeiro frame do sensor
+            deadline = time.monotonic() + self.WARMUP_BUDGET_S
+            while time.monotonic() < deadline:
+                if self.picam2.capture_array() is not None:
+                    break
 
             return True
         except Exception as e:
@@ -137,6 +238,7 @@ class CameraManager:
             return False
 
     def _close_picam2(self):
+        self._picam_isp_rotated = False
         if self.picam2 is not None:
             try:
                 if self.picam2_started:
@@ -155,6 +257,7 @@ class CameraManager:
     # -------------------------
     def start(self) -> bool:
         self.running = True
+        self._stop_evt.clear()
 
         # auto-detect para evitar “USB=1” quando só existe /dev/video0
         devs = self._detect_opencv_devices()
@@ -164,21 +267,22 @@ class CameraManager:
 
         # tenta USB (opencv)
         if self._open_opencv(self.usb_id):
-            self.active_camera_type = CameraType.USB
+            self._set_active_camera(CameraType.USB)
         else:
             # tenta PiCam via Picamera2
             if self._open_picam2():
-                self.active_camera_type = CameraType.PICAM
+                self._set_active_camera(CameraType.PICAM)
             else:
                 # tenta opencv em outros índices (fallback)
                 for d in devs[1:]:
                     if self._open_opencv(d):
                         self.usb_id = d
-                        self.active_camera_type = CameraType.USB
+                        self._set_active_camera(CameraType.USB)
                         break
                 else:
                     print("❌ Nenhuma câmera disponível")
                     self.running = False
+                    self._stop_evt.set()
                     return False
 
         self.thread = threading.Thread(target=self._capture_loop, daemon=True)
@@ -188,13 +292,17 @@ class CameraManager:
 
     def stop(self):
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=2)
+        self._stop_evt.set()
 
+        # fecha antes do join: a thread sai na próxima iteração, sem esperar
+        # um read() preso (lock garante que não fechamos no meio de um read)
         with self.cap_lock:
             self._close_opencv()
             self._close_picam2()
 
+        if self.thread:
+            self.thread.join(timeout=2)
+
         print("✅ CameraManager stop")
 
     # -------------------------
@@ -215,8 +323,6 @@ class CameraManager:
                 self._close_opencv()
                 self._close_picam2()
 
-                time.sleep(0.2)
-
                 if camera_type == CameraType.PICAM:
                     # preferir Picamera2
                     if not self._open_picam2():
@@ -235,11 +341,12 @@ class CameraManager:
                     devs = self._detect_opencv_devices()
                     if self.usb_id not in devs and devs:
                         self.usb_id = devs[0]
+                    self._wait_device(self.usb_id)
                     if not self._open_opencv(self.usb_id):
                         print(f"❌ Falha ao abrir USB (device {self.usb_id})")
                         return
 
-                self.active_camera_type = camera_type
+                self._set_active_camera(camera_type)
 
         finally:
             self.switching = False
@@ -250,18 +357,27 @@ class CameraManager:
     def _capture_loop(self):
         interval = 1.0 / float(self.fps)
 
-        while self.running:
+        if self.CAPTURE_CPU is not None and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, {self.CAPTURE_CPU})
+            except OSError:
+                pass
+
+        stop_evt = self._stop_evt
+        while not stop_evt.is_set():
             if self.switching:
-                time.sleep(0.01)
+                stop_evt.wait(0.01)
+                continue
+
+            if self._viewers == 0:
+                stop_evt.wait(0.1)
                 continue
 
             frame = None
             with self.cap_lock:
                 if self.active_camera_type == CameraType.PICAM and self.picam2_started and self.picam2 is not None:
                     try:
-                        frame = self.picam2.capture_array()  # RGB
-                        # Picamera2 -> vem RGB; OpenCV espera BGR para putText/encode:
-                        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                        frame = self.picam2.capture_array()  # BGR (sem cvtColor)
                     except Exception:
                         frame = None
                 else:
@@ -272,17 +388,21 @@ class CameraManager:
                             frame = f
 
             if frame is not None:
-                if self.active_camera_type == CameraType.PICAM and self.rotate_picam:
+                if (self.active_camera_type == CameraType.PICAM and self.rotate_picam
+                        and not self._picam_isp_rotated):
                     frame = cv2.rotate(frame, self.picam_rotation)
 
                 if self.active_camera_type == CameraType.USB and self.flip_usb:
                     frame = cv2.flip(frame, self.usb_flip_code)
 
                 with self.frame_lock:
-                    self.frame = frame
-                    self.last_good_frame = frame
+                    # último viewer saiu durante a captura: não republica
+                    if self._viewers > 0:
+                        self.frame = frame
+                        self.last_good_frame = frame
+                        self._frame_seq += 1
 
-            time.sleep(interval)
+            stop_evt.wait(interval)
 
     # -------------------------
     # frame API
@@ -295,18 +415,44 @@ class CameraManager:
                 return self.last_good_frame.copy()
             return None
 
-    def get_frame_encoded(self, quality: int = 70) -> Optional[bytes]:
+    def add_viewer(self):
+        with self._viewers_lock:
+            self._viewers += 1
+
+    def remove_viewer(self):
+        with self._viewers_lock:
+            self._viewers = max(0, self._viewers - 1)
+            idle = self._viewers == 0
+        if idle:
+            # loop vai ficar ocioso: próximo viewer não vê frame/JPEG velho
+            with self.frame_lock:
+                self.frame = None
+                self.last_good_frame = None
+                self._encoded = None
+
+    def get_frame_encoded(self, quality: int = DEFAULT_JPEG_QUALITY) -> Optional[memoryview]:
+        with self.frame_lock:
+            seq = self._frame_seq
+            cached = self._encoded
+        # nenhum frame novo desde o último encode: reaproveita (sem overlay/encode)
+        if cached is not None and cached[0] == seq and cached[1] == quality:
+            return cached[2]
+
         frame = self.get_frame()
         if frame is None:
             return None
 
-        label = self.active_camera_type.value.upper()
+        label = self._active_label
         cv2.putText(frame, label, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
 
-        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        ok, buf = cv2.imencode(".jpg", frame, _jpeg_params(quality))
         if not ok:
             return None
-        return buf.tobytes()
+        # sem cópia: view read-only sobre o buffer do imencode (bytes-like)
+        jpeg = memoryview(buf).cast("B").toreadonly()
+        with self.frame_lock:
+            self._encoded = (seq, quality, jpeg)
+        return jpeg
 
     def get_active_camera_type(self) -> CameraType:
         return self.active_camera_type
@@ -318,6 +464,7 @@ class CameraManager:
             "fps": self.fps,
             "resolution": f"{self.width}x{self.height}",
             "switching": self.switching,
+            "viewers": self._viewers,
             "usb_id": self.usb_id,
             "picam_id": self.picam_id,
             "picam2": bool(self.picam2_started),
@@ -21,6 +21,7 @@ LAYOUT PADRÃO (Mode 2 - mais comum em drones):
 
 import time
 import math
+import threading
 from typing import Optional, Dict
 from dataclasses import dataclass
 
@@ -51,6 +52,9 @@ class DroneControlConfig:
     
     # Camera switch delay
     camera_switch_cooldown: float = 1.0  # segundos
+    
+    # Taxa fixa de leitura do gamepad (motores/servos não ganham com >50 Hz)
+    update_rate_hz: float = 50.0
 
 
 class DroneControlMode:
@@ -60,6 +64,9 @@ class DroneControlMode:
     Traduz input do gamepad em comandos suaves para o robô
     """
     
+    MECANUM_GAIN = 400   # ajuste fino depois (300–500)
+    ROTATE_INPUT = 0.5   # vz dos bumpers
+    
     def __init__(
         self,
         robot,
@@ -76,17 +83,53 @@ class DroneControlMode:
         self.gamepad = gamepad
         self.config = config or DroneControlConfig()
         
+        # Métodos do caminho quente resolvidos uma vez
+        self._set_motor = robot.motor.set_motor_model
+        self._set_angle = robot.arm.set_angle
+        
+        # Heartbeat do watchdog (no-op se o robô não tiver Safety)
+        safety = getattr(robot, 'safety', None)
+        self._heartbeat = getattr(safety, 'heartbeat', None) or (lambda: None)
+        self._hb_input_ts = 0.0  # timestamp do último input que gerou heartbeat
+        
         # Estado
         self.enabled = False
+        self._pad_lost = False   # gamepad estava desconectado no último tick
+        self._motors_stopped = False  # evita zero-writes repetidos no I2C
+        self._debug = False  # prints por update (caro a 100+ Hz)
         self.speed_mode = 'normal'  # 'slow', 'normal', 'turbo'
         
+        # Tabela por modo: (ganho dos sticks, PWM de rotação)
+        # Sensibilidade × escala × ganho Mecanum resolvidos uma vez por modo
+        self._drive_tables = {
+            mode: (self.config.drive_sensitivity * scale,
+                   self.MECANUM_GAIN * self.ROTATE_INPUT * scale)
+            for mode, scale in (
+                ('slow', self.config.slow_speed_scale),
+                ('normal', self.config.normal_speed_scale),
+                ('turbo', self.config.turbo_speed_scale)
+            )
+        }
+        self._drive_gain, self._rot_pwm = self._drive_tables[self.speed_mode]
+        
         # Posição alvo da cabeça
         self.target_head_yaw = 90
         self.target_head_pitch = 90
         
-        # Cooldowns
+        # Limites da cabeça resolvidos uma vez
+        self._yaw_limits = (self.config.head_yaw_min, self.config.head_yaw_max)
+        self._pitch_limits = (self.config.head_pitch_min, self.config.head_pitch_max)
+        
+        # Último ângulo *comandado* (current_angles pode nunca chegar no alvo)
+        self._last_cmd_yaw = 90
+        self._last_cmd_pitch = 90
+        
+        # Cooldowns (relógio monotônico, imune a ajustes de NTP)
         self.last_camera_switch = 0.0
         
+        # Thread de polling (taxa fixa)
+        self._poll_thread: Optional[threading.Thread] = None
+        
         # Estatísticas
         self.stats = {
             'commands_sent': 0,
@@ -94,6 +137,16 @@ class DroneControlMode:
             'camera_switches': 0
         }
         
+        # Status reutilizado (atualizado in-place em get_status)
+        self._target_head = {'yaw': self.target_head_yaw, 'pitch': self.target_head_pitch}
+        self._status = {
+            'enabled': False,
+            'speed_mode': self.speed_mode,
+            'target_head': self._target_head,
+            'stats': self.stats,
+            'gamepad_connected': False
+        }
+        
         print("🚁 Drone Control Mode inicializado")
         print(f"   Drive sensitivity: {self.config.drive_sensitivity}")
         print(f"   Head sensitivity: Pan={self.config.head_pan_sensitivity}, "
@@ -109,9 +162,10 @@ class DroneControlMode:
             return
         
         self.enabled = True
+        self._pad_lost = False
+        self._motors_stopped = False
         
-        # Setup callbacks
-        self.gamepad.on_state_change = self._on_gamepad_update
+        # Setup callbacks (eixos são lidos por polling, botões por evento)
         self.gamepad.on_button_press = self._on_button_press
         
         # Centralizar cabeça
@@ -119,6 +173,10 @@ class DroneControlMode:
         self.target_head_pitch = 90
         self.robot.arm.set_angle(0, 90, smooth=True)
         self.robot.arm.set_angle(1, 90, smooth=True)
+        self._sync_head_cmd()
+        
+        self._poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._poll_thread.start()
         
         print("✅ Drone mode ATIVADO")
         print("\n" + "="*60)
@@ -141,11 +199,15 @@ class DroneControlMode:
         
         self.enabled = False
         
+        if self._poll_thread and self._poll_thread is not threading.current_thread():
+            self._poll_thread.join(timeout=1.0)
+        self._poll_thread = None
+        
         # Parar robô
         self.robot.stop_motors()
+        self._motors_stopped = True
         
         # Remover callbacks
-        self.gamepad.on_state_change = None
         self.gamepad.on_button_press = None
         
         print("⚪ Drone mode DESATIVADO")
@@ -154,29 +216,60 @@ class DroneControlMode:
     # GAMEPAD CALLBACKS
     # ========================================
     
+    def _poll_loop(self):
+        """Lê o estado do gamepad a taxa fixa e aplica aos atuadores"""
+        period = 1.0 / self.config.update_rate_hz
+        next_tick = time.monotonic()
+        
+        while self.enabled:
+            try:
+                self._on_gamepad_update(self.gamepad.get_state())
+            except Exception as e:
+                print(f"⚠️  Erro no drone mode: {e}")
+            
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()  # atrasou: não tenta compensar
+    
     def _on_gamepad_update(self, state: GamepadState):
-        """Callback chamado quando estado do gamepad muda"""
+        """Processa um snapshot do gamepad (chamado por _poll_loop)"""
         if not self.enabled:
             return
-        # ❤️ Manter o robô vivo enquanto o modo drone está ativo
-        try:
-            self.robot.safety.heartbeat()
-        except Exception:
-            pass
-        # 🐛 DEBUG - verificar se callback está sendo chamado
-        # Descomentar para debug:
-        if abs(state.left_x) > 0.05 or abs(state.left_y) > 0.05:
-            print(f"🎮 UPDATE: LX={state.left_x:.2f} LY={state.left_y:.2f}")
+        
+        # Gamepad desconectado (_read_loop saiu e deixou o último estado)
+        # → para uma vez, sem heartbeat. Input parado (stick/bumper segurado)
+        # não gera eventos e continua valendo; o watchdog cobre perda real.
+        if not self.gamepad.is_connected():
+            if not self._pad_lost:
+                self._pad_lost = True
+                self._stop_drive()
+                print("⚠️  Gamepad desconectado: motores parados")
+            return
+        self._pad_lost = False
+        
+        # ❤️ Heartbeat só quando chegou evento novo do gamepad (prova o link)
+        if state.timestamp != self._hb_input_ts:
+            self._hb_input_ts = state.timestamp
+            self._heartbeat()
+        # Snapshot do estado em locais (uma leitura de atributo por eixo)
+        lx, ly = state.left_x, state.left_y
+        rx, ry = state.right_x, state.right_y
+        
+        # 🐛 DEBUG - verificar se callback está sendo chamado (self._debug = True)
+        if self._debug and (abs(lx) > 0.05 or abs(ly) > 0.05):
+            print(f"🎮 UPDATE: LX={lx:.2f} LY={ly:.2f}")
         
         # Determinar modo de velocidade
-        self._update_speed_mode(state)
+        self._update_speed_mode(state.left_trigger, state.right_trigger)
         
         # Processar movimento
-        self._process_drive(state)
+        self._process_drive(lx, ly, state.left_bumper, state.right_bumper)
         
         # Processar cabeça
-        self._process_head(state)
-        print("🔥 CALLBACK CHEGOU", state.left_x, state.left_y)
+        self._process_head(rx, ry)
 
     
     def _on_button_press(self, button: str):
@@ -188,11 +281,12 @@ class DroneControlMode:
         if button == 'button_b':
             print("🚨 EMERGENCY STOP")
             self.robot.stop_motors()
+            self._motors_stopped = True
             self.stats['estops_triggered'] += 1
         
         # A/Cross → Switch camera
         elif button == 'button_a':
-            now = time.time()
+            now = time.monotonic()
             if now - self.last_camera_switch > self.config.camera_switch_cooldown:
                 print("📷 Switching camera...")
                 self.robot.switch_camera()
@@ -205,6 +299,7 @@ class DroneControlMode:
             self.target_head_yaw = 90
             self.target_head_pitch = 90
             self.robot.arm.move_to_home()
+            self._sync_head_cmd()
         
         # Y/Triangle → Center cabeça
         elif button == 'button_y':
@@ -212,6 +307,7 @@ class DroneControlMode:
             self.target_head_yaw = 90
             self.target_head_pitch = 90
             self.robot.arm.look_center()
+            self._sync_head_cmd()
         
         # D-Pad → Presets
         elif button == 'dpad_up':
@@ -227,90 +323,108 @@ class DroneControlMode:
     # PROCESSAMENTO
     # ========================================
     
-    def _update_speed_mode(self, state: GamepadState):
+    def _update_speed_mode(self, left_trigger: float, right_trigger: float):
         """Atualiza modo de velocidade baseado nos triggers"""
         # Left trigger → Slow
-        if state.left_trigger > 0.5:
+        if left_trigger > 0.5:
             if self.speed_mode != 'slow':
-                self.speed_mode = 'slow'
+                self._set_speed_mode('slow')
                 print("🐌 SLOW mode")
         
         # Right trigger → Turbo
-        elif state.right_trigger > 0.5:
+        elif right_trigger > 0.5:
             if self.speed_mode != 'turbo':
-                self.speed_mode = 'turbo'
+                self._set_speed_mode('turbo')
                 print("⚡ TURBO mode")
         
         # Normal
         else:
             if self.speed_mode != 'normal':
-                self.speed_mode = 'normal'
+                self._set_speed_mode('normal')
                 print("➡️  NORMAL mode")
     
-    def _process_drive(self, state: GamepadState):
+    def _set_speed_mode(self, mode: str):
+        self.speed_mode = mode
+        self._drive_gain, self._rot_pwm = self._drive_tables[mode]
+    
+    def _process_drive(self, left_x: float, left_y: float,
+                       left_bumper: bool, right_bumper: bool):
         """Processa movimento do robô"""
-        # 🔧 Heartbeat para Safety (evita watchdog timeout)
-        try:
-            self.robot.safety.heartbeat()
-        except Exception:
-            pass
+        # Ler sticks (já com sensibilidade e escala do modo)
+        gain = self._drive_gain
         
-        # Ler sticks
         # Left Y → forward/backward (invertido porque stick pra cima = negativo)
-        vx = -state.left_y * self.config.drive_sensitivity
+        vx = -left_y * gain
         
         # Left X → strafe left/right
-        vy = state.left_x * self.config.drive_sensitivity
+        vy = left_x * gain
         
         # Rotation pode ser mapeado para bumpers ou stick direito X
-        # Usando bumpers: L1 = esquerda, R1 = direita
-        vz = 0.0
-        if state.left_bumper:
-            vz = -0.5  # Girar esquerda
-        elif state.right_bumper:
-            vz = 0.5   # Girar direita
-        
-        # Aplicar escala de velocidade
-        speed_scale = {
-            'slow': self.config.slow_speed_scale,
-            'normal': self.config.normal_speed_scale,
-            'turbo': self.config.turbo_speed_scale
-        }[self.speed_mode]
-        
-        vx *= speed_scale
-        vy *= speed_scale
-        vz *= speed_scale
-        
-        # Deadzone total (parar se input muito pequeno)
-        if abs(vx) < 0.05 and abs(vy) < 0.05 and abs(vz) < 0.05:
-            self.robot.stop_motors()
-            return
+        # Usando bumpers: L1 = esquerda, R1 = direita (PWM pré-calculado)
+        rot = 0.0
+        if left_bumper:
+            rot = -self._rot_pwm  # Girar esquerda
+        elif right_bumper:
+            rot = self._rot_pwm   # Girar direita
+        
+        # Deadzone radial na translação (sem sqrt no caso comum)
+        r = 0.05
+        speed2 = vx * vx + vy * vy
+        if speed2 < r * r:
+            if not rot:
+                self._stop_drive()
+                return
+            vx = vy = 0.0
+        else:
+            # Reescala para sair do zero sem salto na borda da deadzone
+            mag = math.sqrt(speed2)
+            k = (mag - r) / ((1.0 - r) * mag)
+            vx *= k
+            vy *= k
         
         # Calcular PWM para Mecanum wheels
         # Mecanum permite movimento omnidirecional
         speed_base = 1500  # PWM base
         
-        scale = 400  # ajuste fino depois (300–500)
+        scale = self.MECANUM_GAIN
         # Fórmula Mecanum:
         # FL = vx - vy - vz
         # BL = vx + vy - vz
         # FR = vx + vy + vz
         # BR = vx - vy + vz
         
-        fl = int(speed_base + scale * (vx - vy - vz))
-        bl = int(speed_base + scale * (vx + vy - vz))
-        fr = int(speed_base + scale * (vx + vy + vz))
-        br = int(speed_base + scale * (vx - vy + vz))
+        # vx±vy compartilhados pelas quatro rodas
+        diff = scale * (vx - vy)
+        summ = scale * (vx + vy)
+        
+        fl = int(speed_base + diff - rot)
+        bl = int(speed_base + summ - rot)
+        fr = int(speed_base + summ + rot)
+        br = int(speed_base + diff + rot)
         
         # Aplicar ao robô
-        self.robot.motor.set_motor_model(fl, bl, fr, br)
+        self._set_motor(fl, bl, fr, br)
+        self._motors_stopped = False
         self.stats['commands_sent'] += 1
     
-    def _process_head(self, state: GamepadState):
+    def _stop_drive(self):
+        """Para os motores só na transição (não a cada tick)"""
+        if not self._motors_stopped:
+            self.robot.stop_motors()
+            self._motors_stopped = True
+    
+    def _process_head(self, right_x: float, right_y: float):
         """Processa movimento da cabeça"""
         # Right stick → Pan (X) e Tilt (Y)
-        pan_input = state.right_x * self.config.head_pan_sensitivity
-        tilt_input = -state.right_y * self.config.head_tilt_sensitivity  # Invertido
+        pan_input = right_x * self.config.head_pan_sensitivity
+        tilt_input = -right_y * self.config.head_tilt_sensitivity  # Invertido
+        
+        # Stick parado: alvos não mudam e já foram comandados
+        if -0.05 <= pan_input <= 0.05 and -0.05 <= tilt_input <= 0.05:
+            return
+        
+        yaw_lo, yaw_hi = self._yaw_limits
+        pitch_lo, pitch_hi = self._pitch_limits
         
         # Atualizar alvos
         if abs(pan_input) > 0.05:
@@ -319,31 +433,33 @@ class DroneControlMode:
             self.target_head_yaw += pan_delta
             
             # Clamp
-            self.target_head_yaw = max(
-                self.config.head_yaw_min,
-                min(self.config.head_yaw_max, self.target_head_yaw)
-            )
+            t = self.target_head_yaw
+            self.target_head_yaw = yaw_hi if t > yaw_hi else yaw_lo if t < yaw_lo else t
         
         if abs(tilt_input) > 0.05:
             tilt_delta = tilt_input * self.config.head_smooth_speed
             self.target_head_pitch += tilt_delta
             
             # Clamp
-            self.target_head_pitch = max(
-                self.config.head_pitch_min,
-                min(self.config.head_pitch_max, self.target_head_pitch)
-            )
+            t = self.target_head_pitch
+            self.target_head_pitch = pitch_hi if t > pitch_hi else pitch_lo if t < pitch_lo else t
         
         # Aplicar (sem smooth para responsividade)
-        current_yaw = self.robot.arm.current_angles.get(0, 90)
-        current_pitch = self.robot.arm.current_angles.get(1, 90)
-        
-        # Só mover se diferença significativa
-        if abs(self.target_head_yaw - current_yaw) > 2:
-            self.robot.arm.set_angle(0, int(self.target_head_yaw), smooth=False)
-        
-        if abs(self.target_head_pitch - current_pitch) > 2:
-            self.robot.arm.set_angle(1, int(self.target_head_pitch), smooth=False)
+        # Só escreve no barramento quando o comando muda
+        yaw_cmd = int(self.target_head_yaw)
+        if yaw_cmd != self._last_cmd_yaw:
+            self._set_angle(0, yaw_cmd, smooth=False)
+            self._last_cmd_yaw = yaw_cmd
+        
+        pitch_cmd = int(self.target_head_pitch)
+        if pitch_cmd != self._last_cmd_pitch:
+            self._set_angle(1, pitch_cmd, smooth=False)
+            self._last_cmd_pitch = pitch_cmd
+    
+    def _sync_head_cmd(self):
+        """Registra o alvo atual como já comandado (após presets/home)"""
+        self._last_cmd_yaw = int(self.target_head_yaw)
+        self._last_cmd_pitch = int(self.target_head_pitch)
     
     # ========================================
     # PRESETS
@@ -356,6 +472,7 @@ class DroneControlMode:
         self.target_head_pitch = 110
         self.robot.arm.set_angle(0, 90, smooth=True)
         self.robot.arm.set_angle(1, 110, smooth=True)
+        self._sync_head_cmd()
     
     def _head_preset_down(self):
         """Cabeça para baixo (chão)"""
@@ -364,6 +481,7 @@ class DroneControlMode:
         self.target_head_pitch = 140
         self.robot.arm.set_angle(0, 90, smooth=True)
         self.robot.arm.set_angle(1, 140, smooth=True)
+        self._sync_head_cmd()
     
     def _head_preset_left(self):
         """Cabeça para esquerda"""
@@ -372,6 +490,7 @@ class DroneControlMode:
         self.target_head_pitch = 110
         self.robot.arm.set_angle(0, 45, smooth=True)
         self.robot.arm.set_angle(1, 110, smooth=True)
+        self._sync_head_cmd()
     
     def _head_preset_right(self):
         """Cabeça para direita"""
@@ -380,23 +499,21 @@ class DroneControlMode:
         self.target_head_pitch = 110
         self.robot.arm.set_angle(0, 135, smooth=True)
         self.robot.arm.set_angle(1, 110, smooth=True)
+        self._sync_head_cmd()
     
     # ========================================
     # STATUS
     # ========================================
     
     def get_status(self) -> Dict:
-        """Retorna status do modo drone"""
-        return {
-            'enabled': self.enabled,
-            'speed_mode': self.speed_mode,
-            'target_head': {
-                'yaw': self.target_head_yaw,
-                'pitch': self.target_head_pitch
-            },
-            'stats': self.stats,
-            'gamepad_connected': self.gamepad.is_connected()
-        }
+        """Retorna status do modo drone (dict reutilizado: tratar como somente leitura)"""
+        status = self._status
+        status['enabled'] = self.enabled
+        status['speed_mode'] = self.speed_mode
+        self._target_head['yaw'] = self.target_head_yaw
+        self._target_head['pitch'] = self.target_head_pitch
+        status['gamepad_connected'] = self.gamepad.is_connected()
+        return status
 
 
 # ============================================================================
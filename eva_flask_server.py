@@ -15,6 +15,7 @@ ACESSE DO PC:
 
 from flask import Flask, render_template, Response, jsonify
 from flask_socketio import SocketIO, emit
+import io
 import cv2
 import time
 import threading
@@ -40,6 +41,20 @@ except:
     PICAM_OK = False
     print("⚠️ PiCamera2 não disponível")
 
+try:
+    from picamera2 import MappedArray
+    from picamera2.encoders import MJPEGEncoder, Quality
+    from picamera2.outputs import FileOutput
+    PICAM_MJPEG_OK = True
+except:
+    PICAM_MJPEG_OK = False
+
+try:
+    import simplejpeg
+    SIMPLEJPEG_OK = True
+except:
+    SIMPLEJPEG_OK = False
+
 try:
     from arm_calibration import ArmController
     ARM_OK = True
@@ -59,6 +74,67 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 # SISTEMA DUAL DE CÂMERAS
 # ==========================================
 
+# Parâmetros JPEG por câmera (4:2:0 explícito, montados uma vez)
+# USB/navegação: cena ampla em movimento → qualidade menor, menos bytes no WiFi
+# Pi Camera/braço: inspeção de objetos → qualidade maior
+NAV_JPEG_QUALITY = 55
+ARM_JPEG_QUALITY = 75
+
+JPEG_QUALITY = {"usb": NAV_JPEG_QUALITY, "picam": ARM_JPEG_QUALITY}
+
+# MJPEGEncoder (hardware) não tem q de JPEG: mapeia para o Quality do Picamera2,
+# que define o bitrate pela resolução/fps
+def mjpeg_quality(q):
+    if q >= 90:
+        return Quality.VERY_HIGH
+    if q >= 75:
+        return Quality.HIGH
+    if q >= 55:
+        return Quality.MEDIUM
+    if q >= 35:
+        return Quality.LOW
+    return Quality.VERY_LOW
+
+JPEG_PARAMS = {
+    cam: [cv2.IMWRITE_JPEG_QUALITY, q,
+          cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420]
+    for cam, q in JPEG_QUALITY.items()
+}
+
+
+def encode_jpeg(frame, cam):
+    """JPEG do frame BGR (simplejpeg se disponível, senão cv2); None se falhar"""
+    if SIMPLEJPEG_OK:
+        try:
+            return simplejpeg.encode_jpeg(
+                frame, quality=JPEG_QUALITY[cam], colorspace='BGR',
+                colorsubsampling='420', fastdct=True
+            )
+        except Exception:
+            pass
+    
+    ret, jpeg = cv2.imencode('.jpg', frame, JPEG_PARAMS[cam])
+    return jpeg if ret else None
+
+# Badge por câmera: (texto, cor BGR)
+CAMERA_BADGES = {
+    "usb": ("USB", (0, 255, 0)),
+    "picam": ("PICAM", (255, 100, 255)),
+}
+
+class StreamingOutput(io.BufferedIOBase):
+    """Último JPEG pronto; acorda quem espera na condition a cada frame"""
+    
+    def __init__(self):
+        self.frame = None
+        self.condition = threading.Condition()
+    
+    def write(self, buf):
+        with self.condition:
+            self.frame = buf
+            self.condition.notify_all()
+
+
 class DualCameraSystem:
     """
     Sistema inteligente com 2 câmeras:
@@ -76,11 +152,25 @@ class DualCameraSystem:
         self.usb_camera = None
         self.pi_camera = None
         
+        # Último JPEG pronto, compartilhado por todos os clientes MJPEG
+        # (USB: codificado uma vez no _capture_loop; Pi Camera: MJPEGEncoder)
+        self.output = StreamingOutput()
+        self.picam_hw_jpeg = PICAM_MJPEG_OK
+        
         self.active_camera = "usb"  # Padrão: navegação
         self.running = False
         self.frame = None
         self.lock = threading.Lock()
         
+        # Captura sob demanda: sem viewers MJPEG o loop fica ocioso
+        self._viewers = 0
+        self._viewers_lock = threading.Lock()
+        self.picam_idle_stop = 5.0  # ocioso por 5s → desliga a Pi Camera
+        
+        # Double buffer da USB: read() escreve no buffer não publicado
+        self._usb_bufs = [None, None]
+        self._usb_buf_idx = 0
+        
         # Auto-switch
         self.last_arm_move_time = 0.0
         self.arm_idle_timeout = 3.0  # 3s sem mexer braço → volta USB
@@ -123,12 +213,18 @@ class DualCameraSystem:
                 
                 self.pi_camera = Picamera2()
                 
+                # Picamera2 "RGB888" = [B,G,R] por pixel: já na ordem do OpenCV
+                # (sem cvtColor por frame; o MJPEGEncoder interpreta igual)
                 config = self.pi_camera.create_preview_configuration(
                     main={"size": (640, 480), "format": "RGB888"}
                 )
                 
                 self.pi_camera.configure(config)
                 
+                if self.picam_hw_jpeg:
+                    # Badge desenhado no frame antes do encoder
+                    self.pi_camera.pre_callback = self._picam_badge
+                
                 print("  ✅ Pi Camera configurada (ov5647)")
                 # NÃO inicia ainda - só quando necessário
             
@@ -144,7 +240,6 @@ class DualCameraSystem:
         
         self.running = True
         threading.Thread(target=self._capture_loop, daemon=True).start()
-        threading.Thread(target=self._auto_switch_loop, daemon=True).start()
         
         print(f"✅ Sistema dual iniciado (ativa: {self.active_camera.upper()})")
         return True
@@ -158,19 +253,71 @@ class DualCameraSystem:
         
         pi_cam_active = False  # Estado da Pi Camera
         
+        period = 0.033  # ~30 FPS
+        next_tick = time.monotonic()
+        idle_since = None
+        
         while self.running:
             try:
+                # Auto-switch: braço parado → volta pra USB
+                if self.active_camera == "picam":
+                    idle_time = time.monotonic() - self.last_arm_move_time
+                    
+                    if idle_time >= self.arm_idle_timeout:
+                        print(f"⏰ Braço parado por {idle_time:.1f}s → USB")
+                        self.active_camera = "usb"
+                
+                # Ninguém assistindo: não captura (e desliga Pi Camera se demorar)
+                if self._viewers == 0:
+                    now = time.monotonic()
+                    if idle_since is None:
+                        idle_since = now
+                        # próximo viewer não vê frame velho
+                        with self.lock:
+                            self.frame = None
+                        self.output.write(None)
+                    elif pi_cam_active and now - idle_since >= self.picam_idle_stop:
+                        try:
+                            self._stop_picam()
+                        except:
+                            pass
+                        pi_cam_active = False
+                        print("📷 Pi Camera desligada (sem viewers)")
+                    time.sleep(0.1)
+                    next_tick = time.monotonic()
+                    continue
+                idle_since = None
+                
                 frame = None
                 
                 # Decidir qual câmera usar
                 if self.active_camera == "picam" and self.pi_camera:
                     # Pi Camera
+                    src = "picam"
                     
                     # Iniciar se necessário
                     if not pi_cam_active:
                         try:
-                            self.pi_camera.start()
-                            time.sleep(1.0)  # Estabilizar
+                            # Sem sleep fixo: o 1º frame sai quando o sensor entrega,
+                            # e AE/AWB assentam nos frames seguintes
+                            if self.picam_hw_jpeg:
+                                try:
+                                    self.pi_camera.start_recording(
+                                        MJPEGEncoder(), FileOutput(self.output),
+                                        quality=mjpeg_quality(ARM_JPEG_QUALITY)
+                                    )
+                                except Exception as e:
+                                    # Sem encoder JPEG em hardware (ex.: Pi 5):
+                                    # passa a usar capture_array + encode por software
+                                    print(f"⚠️ MJPEG em hardware indisponível ({e}) → software")
+                                    self.picam_hw_jpeg = False
+                                    self.pi_camera.pre_callback = None
+                                    try:
+                                        self.pi_camera.stop()
+                                    except:
+                                        pass
+                            if not self.picam_hw_jpeg:
+                                self.pi_camera.start()
                             pi_cam_active = True
                             print("📷 Pi Camera ATIVADA")
                         except Exception as e:
@@ -178,23 +325,21 @@ class DualCameraSystem:
                             self.active_camera = "usb"  # Fallback
                             continue
                     
-                    # Capturar
-                    try:
-                        frame = self.pi_camera.capture_array()
-                        
-                        if frame is not None and len(frame.shape) == 3:
-                            # RGB → BGR
-                            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                    except Exception as e:
-                        print(f"⚠️ Erro captura Pi Camera: {e}")
+                    # Capturar (com encoder em hardware o JPEG chega sozinho)
+                    if not self.picam_hw_jpeg:
+                        try:
+                            frame = self.pi_camera.capture_array()
+                        except Exception as e:
+                            print(f"⚠️ Erro captura Pi Camera: {e}")
                 
                 else:
                     # USB Camera
+                    src = "usb"
                     
                     # Parar Pi Camera se estava ativa
                     if pi_cam_active:
                         try:
-                            self.pi_camera.stop()
+                            self._stop_picam()
                             pi_cam_active = False
                             print("📹 Voltando para USB REDRAGON")
                         except:
@@ -202,16 +347,31 @@ class DualCameraSystem:
                     
                     # Capturar USB
                     if self.usb_camera and self.usb_camera.isOpened():
-                        ret, frame = self.usb_camera.read()
+                        idx = self._usb_buf_idx
+                        ret, frame = self.usb_camera.read(self._usb_bufs[idx])
                         
                         if not ret or frame is None:
                             frame = None
+                        else:
+                            self._usb_bufs[idx] = frame
+                            self._usb_buf_idx = idx ^ 1
                 
                 # Salvar frame
                 if frame is not None:
+                    # Badge + JPEG uma vez por frame, para todos os clientes
+                    cam_text, color = CAMERA_BADGES[src]
+                    cv2.rectangle(frame, (10, 10), (150, 50), (0, 0, 0), -1)
+                    cv2.putText(frame, cam_text, (20, 40),
+                               cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+                    
+                    jpeg = encode_jpeg(frame, src)
+                    
                     with self.lock:
                         self.frame = frame
                     
+                    if jpeg is not None:
+                        self.output.write(jpeg)
+                    
                     # FPS counter
                     frame_count += 1
                     if frame_count % 30 == 0:
@@ -220,38 +380,40 @@ class DualCameraSystem:
                         print(f"📊 {self.active_camera.upper()}: {fps:.1f} FPS | {frame_count} frames")
                         last_fps_time = now
                 
-                time.sleep(0.033)  # ~30 FPS
+                # Cadência por deadline (desconta o tempo de captura)
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic()  # atrasou: não acumula
             
             except Exception as e:
                 print(f"❌ Erro no loop: {e}")
                 time.sleep(1.0)
+                next_tick = time.monotonic()
         
         # Cleanup ao sair
         if pi_cam_active and self.pi_camera:
             try:
-                self.pi_camera.stop()
+                self._stop_picam()
             except:
                 pass
     
-    def _auto_switch_loop(self):
-        """Loop que verifica timeout do braço"""
-        while self.running:
-            try:
-                # Se está em modo Pi Camera
-                if self.active_camera == "picam":
-                    # Verificar timeout
-                    idle_time = time.time() - self.last_arm_move_time
-                    
-                    if idle_time >= self.arm_idle_timeout:
-                        # Voltar para USB
-                        print(f"⏰ Braço parado por {idle_time:.1f}s → USB")
-                        self.active_camera = "usb"
-                
-                time.sleep(0.5)
-            
-            except Exception as e:
-                print(f"❌ Erro auto-switch: {e}")
-                time.sleep(1.0)
+    def _stop_picam(self):
+        """Para a Pi Camera (e o encoder, se estiver gravando)"""
+        if self.picam_hw_jpeg:
+            self.pi_camera.stop_recording()
+        else:
+            self.pi_camera.stop()
+    
+    def _picam_badge(self, request):
+        """pre_callback do Picamera2: badge no frame antes do JPEG em hardware"""
+        cam_text, color = CAMERA_BADGES["picam"]
+        with MappedArray(request, "main") as m:
+            cv2.rectangle(m.array, (10, 10), (150, 50), (0, 0, 0), -1)
+            cv2.putText(m.array, cam_text, (20, 40),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
     
     def switch_to_arm_camera(self):
         """Troca para Pi Camera (braço movendo)"""
@@ -260,7 +422,7 @@ class DualCameraSystem:
             self.active_camera = "picam"
         
         # Atualizar timestamp
-        self.last_arm_move_time = time.time()
+        self.last_arm_move_time = time.monotonic()
     
     def switch_to_navigation(self):
         """Troca para USB (navegação)"""
@@ -268,17 +430,33 @@ class DualCameraSystem:
             print("🔄 Trocando para USB REDRAGON (navegação)")
             self.active_camera = "usb"
     
+    def add_viewer(self):
+        with self._viewers_lock:
+            self._viewers += 1
+    
+    def remove_viewer(self):
+        with self._viewers_lock:
+            self._viewers = max(0, self._viewers - 1)
+    
     def get_frame(self):
         """Retorna último frame"""
         with self.lock:
             return self.frame.copy() if self.frame is not None else None
     
+    def wait_jpeg(self, timeout=1.0):
+        """Espera o próximo JPEG pronto (None se ainda não há frame)"""
+        out = self.output
+        with out.condition:
+            out.condition.wait(timeout)
+            return out.frame
+    
     def get_status(self):
         """Status do sistema"""
         return {
             "active": self.active_camera.upper(),
             "usb_available": self.usb_camera is not None,
-            "picam_available": self.pi_camera is not None
+            "picam_available": self.pi_camera is not None,
+            "viewers": self._viewers
         }
     
     def stop(self):
@@ -464,37 +642,41 @@ def status():
         'time': time.time()
     })
 
+# Delimitadores multipart constantes (montados uma vez)
+MJPEG_PART_HEAD = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+MJPEG_PART_TAIL = b'\r\n'
+
+def _waiting_jpeg():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.putText(frame, "Aguardando camera...", (150, 240),
+               cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    return cv2.imencode('.jpg', frame)[1].tobytes()
+
+# Placeholder enquanto não há frame (codificado uma vez)
+WAITING_JPEG = _waiting_jpeg()
+
 def generate_video():
-    """Gerador MJPEG"""
-    while True:
-        frame = camera_system.get_frame()
-        
-        if frame is None:
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(frame, "Aguardando camera...", (150, 240),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        
-        # Badge mostrando câmera ativa
-        cam_text = camera_system.active_camera.upper()
-        color = (0, 255, 0) if cam_text == "USB" else (255, 100, 255)
-        
-        cv2.rectangle(frame, (10, 10), (150, 50), (0, 0, 0), -1)
-        cv2.putText(frame, cam_text, (20, 40),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-        
-        ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-        
-        if ret:
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n')
-        
-        time.sleep(0.033)
+    """Gerador MJPEG: só repassa o JPEG já codificado pelo sistema de câmeras"""
+    camera_system.add_viewer()
+    try:
+        while True:
+            jpeg = camera_system.wait_jpeg()
+            
+            if jpeg is None:
+                jpeg = WAITING_JPEG
+            
+            # join aceita bytes ou o buffer do numpy (cv2) sem cópia extra
+            yield b''.join((MJPEG_PART_HEAD, jpeg, MJPEG_PART_TAIL))
+    finally:
+        # Cliente desconectou (GeneratorExit)
+        camera_system.remove_viewer()
 
 @app.route('/video_feed')
 def video_feed():
     return Response(
         generate_video(),
-        mimetype='multipart/x-mixed-replace; boundary=frame'
+        mimetype='multipart/x-mixed-replace; boundary=frame',
+        headers={'Cache-Control': 'no-cache'}
     )
 
 # ==========================================
@@ -519,6 +701,29 @@ def handle_disconnect():
     print("🔌 Cliente desconectado")
     robot.stop()
 
+def _cmd_drive(params):
+    return robot.drive(
+        vx=params.get('vx', 0),
+        vy=params.get('vy', 0),
+        vz=params.get('vz', 0)
+    )
+
+def _cmd_head(params):
+    return robot.move_head(
+        yaw=params.get('yaw'),
+        pitch=params.get('pitch')
+    )
+
+def _cmd_stop(params):
+    return robot.stop()
+
+# Tabela de despacho (montada uma vez)
+COMMAND_HANDLERS = {
+    'drive': _cmd_drive,
+    'head': _cmd_head,
+    'stop': _cmd_stop,
+}
+
 @socketio.on('command')
 def handle_command(data):
     cmd = data.get('cmd')
@@ -526,22 +731,9 @@ def handle_command(data):
     
     print(f"📨 CMD: {cmd} {params}")
     
-    if cmd == 'drive':
-        result = robot.drive(
-            vx=params.get('vx', 0),
-            vy=params.get('vy', 0),
-            vz=params.get('vz', 0)
-        )
-    
-    elif cmd == 'head':
-        result = robot.move_head(
-            yaw=params.get('yaw'),
-            pitch=params.get('pitch')
-        )
-    
-    elif cmd == 'stop':
-        result = robot.stop()
-    
+    handler = COMMAND_HANDLERS.get(cmd)
+    if handler:
+        result = handler(params)
     else:
         result = {"status": "error", "error": f"Comando desconhecido: {cmd}"}
     
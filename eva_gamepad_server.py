@@ -205,16 +205,26 @@ class EVAGamepadServer:
     def _video_loop(self):
         """Loop de streaming de vídeo"""
         print("📹 Video loop iniciado")
+        camera = self.robot.camera_manager
+        viewing = False
         
         while not self.stop_event.is_set() and self.running:
             try:
                 # Verificar se há cliente conectado
                 if not self.server.is_video_server_connected():
+                    if viewing:
+                        camera.remove_viewer()
+                        viewing = False
                     time.sleep(0.1)
                     continue
                 
+                # Captura só roda enquanto houver viewer
+                if not viewing:
+                    camera.add_viewer()
+                    viewing = True
+                
                 # Verificar se está trocando câmera
-                if self.robot.camera_manager.switching:
+                if camera.switching:
                     time.sleep(0.02)
                     continue
                 
@@ -240,6 +250,9 @@ class EVAGamepadServer:
                 print(f"⚠️  Erro no vídeo: {e}")
                 time.sleep(0.1)
         
+        if viewing:
+            camera.remove_viewer()
+        
         print("📹 Video loop finalizado")
     
     def _telemetry_loop(self):
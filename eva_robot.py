@@ -15,7 +15,7 @@ from typing import Optional
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from robot_core import Servo, Ordinary_Car, Ultrasonic
-from camera_manager import CameraManager, CameraType
+from camera_manager import CameraManager, CameraType, DEFAULT_JPEG_QUALITY
 from arm_controller import ArmController
 from robot_state import STATE
 from safety import SafetyController
@@ -153,7 +153,7 @@ class EVARobot:
         STATE.update(active_camera=self.camera_manager.get_active_camera_type().value)
         time.sleep(0.1)
 
-    def get_camera_frame_encoded(self, quality=70):
+    def get_camera_frame_encoded(self, quality=DEFAULT_JPEG_QUALITY):
         return self.camera_manager.get_frame_encoded(quality)
 
     # ------------------ Status ------------------
@@ -8,6 +8,7 @@ import sys
 import time
 import struct
 import threading
+from functools import lru_cache, partial
 from typing import Optional
 import sys
 import os
@@ -55,19 +56,41 @@ class CommandParser:
     CMD_PING = "CMD_PING"
     
     @staticmethod
+    @lru_cache(maxsize=256)
     def parse(command: str) -> tuple:
         """
         Parse comando recebido
         
+        Clientes repetem muito os mesmos comandos (ex.: "CMD_FORWARD,1500"),
+        então o resultado é cacheado; args é tupla para ser imutável.
+        
         Returns:
             (cmd, args) - comando e argumentos
         """
         parts = command.strip().split(',')
         cmd = parts[0]
-        args = parts[1:] if len(parts) > 1 else []
+        args = tuple(parts[1:])
         return cmd, args
 
 
+# Comandos "CMD,valor" que só repassam um inteiro ao EVARobot:
+# cmd -> (método do EVARobot, resposta, valor padrão)
+VALUE_COMMANDS = {
+    # Movimento (velocidade)
+    CommandParser.CMD_FORWARD: ("move_forward", "OK:FORWARD", 1500),
+    CommandParser.CMD_BACKWARD: ("move_backward", "OK:BACKWARD", 1500),
+    CommandParser.CMD_LEFT: ("turn_left", "OK:LEFT", 1500),
+    CommandParser.CMD_RIGHT: ("turn_right", "OK:RIGHT", 1500),
+    CommandParser.CMD_STRAFE_LEFT: ("strafe_left", "OK:STRAFE_LEFT", 1500),
+    CommandParser.CMD_STRAFE_RIGHT: ("strafe_right", "OK:STRAFE_RIGHT", 1500),
+    # Braço (graus)
+    CommandParser.CMD_ARM_LEFT: ("arm_look_left", "OK:ARM_LEFT", 30),
+    CommandParser.CMD_ARM_RIGHT: ("arm_look_right", "OK:ARM_RIGHT", 30),
+    CommandParser.CMD_ARM_UP: ("arm_look_up", "OK:ARM_UP", 20),
+    CommandParser.CMD_ARM_DOWN: ("arm_look_down", "OK:ARM_DOWN", 20),
+}
+
+
 class EVAServer:
     """Servidor principal do robô EVA"""
     
@@ -94,6 +117,7 @@ class EVAServer:
         
         # Parser
         self.parser = CommandParser()
+        self._handlers = self._build_handlers()
         
         print("✅ EVAServer inicializado")
     
@@ -173,125 +197,115 @@ class EVAServer:
         """
         cmd, args = self.parser.parse(command)
         
+        handler = self._handlers.get(cmd)
+        if handler is None:
+            return f"ERROR:UNKNOWN_COMMAND:{cmd}"
+        
         try:
+            return handler(args)
+        except Exception as e:
+            return f"ERROR:{str(e)}"
+    
+    # ========================================
+    # HANDLERS (cmd -> handler em self._handlers)
+    # ========================================
+    
+    def _build_handlers(self) -> dict:
+        p = self.parser
+        handlers = {
+            cmd: partial(self._cmd_with_value, method, response, default)
+            for cmd, (method, response, default) in VALUE_COMMANDS.items()
+        }
+        handlers.update({
             # Comandos de movimento
-            if cmd == self.parser.CMD_FORWARD:
-                speed = int(args[0]) if args else 1500
-                self.robot.move_forward(speed)
-                return "OK:FORWARD"
-            
-            elif cmd == self.parser.CMD_BACKWARD:
-                speed = int(args[0]) if args else 1500
-                self.robot.move_backward(speed)
-                return "OK:BACKWARD"
-            
-            elif cmd == self.parser.CMD_LEFT:
-                speed = int(args[0]) if args else 1500
-                self.robot.turn_left(speed)
-                return "OK:LEFT"
-            
-            elif cmd == self.parser.CMD_RIGHT:
-                speed = int(args[0]) if args else 1500
-                self.robot.turn_right(speed)
-                return "OK:RIGHT"
-            
-            elif cmd == self.parser.CMD_STRAFE_LEFT:
-                speed = int(args[0]) if args else 1500
-                self.robot.strafe_left(speed)
-                return "OK:STRAFE_LEFT"
-            
-            elif cmd == self.parser.CMD_STRAFE_RIGHT:
-                speed = int(args[0]) if args else 1500
-                self.robot.strafe_right(speed)
-                return "OK:STRAFE_RIGHT"
-            
-            elif cmd == self.parser.CMD_STOP:
-                self.robot.stop_motors()
-                return "OK:STOP"
-            
+            p.CMD_STOP: self._cmd_stop,
             # Comandos de câmera
-            elif cmd == self.parser.CMD_CAMERA_SWITCH:
-                self.robot.switch_camera()
-                camera_type = self.robot.camera_manager.get_active_camera_type()
-                return f"OK:CAMERA:{camera_type.value.upper()}"
-            
-            elif cmd == self.parser.CMD_CAMERA_USB:
-                self.robot.switch_camera(CameraType.USB)
-                return "OK:CAMERA:USB"
-            
-            elif cmd == self.parser.CMD_CAMERA_PI:
-                self.robot.switch_camera(CameraType.PICAM)
-                return "OK:CAMERA:PI"
-            
+            p.CMD_CAMERA_SWITCH: self._cmd_camera_switch,
+            p.CMD_CAMERA_USB: self._cmd_camera_usb,
+            p.CMD_CAMERA_PI: self._cmd_camera_pi,
             # Comandos do braço
-            elif cmd == self.parser.CMD_ARM_LEFT:
-                degrees = int(args[0]) if args else 30
-                self.robot.arm_look_left(degrees)
-                return "OK:ARM_LEFT"
-            
-            elif cmd == self.parser.CMD_ARM_RIGHT:
-                degrees = int(args[0]) if args else 30
-                self.robot.arm_look_right(degrees)
-                return "OK:ARM_RIGHT"
-            
-            elif cmd == self.parser.CMD_ARM_UP:
-                degrees = int(args[0]) if args else 20
-                self.robot.arm_look_up(degrees)
-                return "OK:ARM_UP"
-            
-            elif cmd == self.parser.CMD_ARM_DOWN:
-                degrees = int(args[0]) if args else 20
-                self.robot.arm_look_down(degrees)
-                return "OK:ARM_DOWN"
-            
-            elif cmd == self.parser.CMD_ARM_CENTER:
-                self.robot.arm_look_center()
-                return "OK:ARM_CENTER"
-            
-            elif cmd == self.parser.CMD_ARM_SERVO:
-                if len(args) >= 2:
-                    channel = int(args[0])
-                    angle = int(args[1])
-                    smooth = args[2].lower() == 'true' if len(args) > 2 else False
-                    self.robot.arm_set_angle(channel, angle, smooth)
-                    return f"OK:ARM_SERVO:{channel}:{angle}"
-                return "ERROR:INVALID_ARGS"
-            
+            p.CMD_ARM_CENTER: self._cmd_arm_center,
+            p.CMD_ARM_SERVO: self._cmd_arm_servo,
             # Comandos de modo
-            elif cmd == self.parser.CMD_MODE_MANUAL:
-                self.robot.set_mode(RobotMode.MANUAL)
-                return "OK:MODE:MANUAL"
-            
-            elif cmd == self.parser.CMD_MODE_AUTO:
-                self.robot.set_mode(RobotMode.AUTONOMOUS)
-                return "OK:MODE:AUTO"
-            
+            p.CMD_MODE_MANUAL: self._cmd_mode_manual,
+            p.CMD_MODE_AUTO: self._cmd_mode_auto,
             # Comandos de status
-            elif cmd == self.parser.CMD_STATUS:
-                status = self.robot.get_status()
-                return f"OK:STATUS:{status}"
-            
-            elif cmd == self.parser.CMD_PING:
-                return "OK:PONG"
-            
-            else:
-                return f"ERROR:UNKNOWN_COMMAND:{cmd}"
-        
-        except Exception as e:
-            return f"ERROR:{str(e)}"
+            p.CMD_STATUS: self._cmd_status,
+            p.CMD_PING: self._cmd_ping,
+        })
+        return handlers
+    
+    def _cmd_with_value(self, method: str, response: str, default: int, args) -> str:
+        value = int(args[0]) if args else default
+        getattr(self.robot, method)(value)
+        return response
+    
+    def _cmd_stop(self, args) -> str:
+        self.robot.stop_motors()
+        return "OK:STOP"
+    
+    def _cmd_camera_switch(self, args) -> str:
+        self.robot.switch_camera()
+        camera_type = self.robot.camera_manager.get_active_camera_type()
+        return f"OK:CAMERA:{camera_type.value.upper()}"
+    
+    def _cmd_camera_usb(self, args) -> str:
+        self.robot.switch_camera(CameraType.USB)
+        return "OK:CAMERA:USB"
+    
+    def _cmd_camera_pi(self, args) -> str:
+        self.robot.switch_camera(CameraType.PICAM)
+        return "OK:CAMERA:PI"
+    
+    def _cmd_arm_center(self, args) -> str:
+        self.robot.arm_look_center()
+        return "OK:ARM_CENTER"
+    
+    def _cmd_arm_servo(self, args) -> str:
+        if len(args) >= 2:
+            channel = int(args[0])
+            angle = int(args[1])
+            smooth = args[2].lower() == 'true' if len(args) > 2 else False
+            self.robot.arm_set_angle(channel, angle, smooth)
+            return f"OK:ARM_SERVO:{channel}:{angle}"
+        return "ERROR:INVALID_ARGS"
+    
+    def _cmd_mode_manual(self, args) -> str:
+        self.robot.set_mode(RobotMode.MANUAL)
+        return "OK:MODE:MANUAL"
+    
+    def _cmd_mode_auto(self, args) -> str:
+        self.robot.set_mode(RobotMode.AUTONOMOUS)
+        return "OK:MODE:AUTO"
+    
+    def _cmd_status(self, args) -> str:
+        status = self.robot.get_status()
+        return f"OK:STATUS:{status}"
+    
+    def _cmd_ping(self, args) -> str:
+        return "OK:PONG"
     
     def _video_loop(self):
+        camera = self.robot.camera_manager
+        viewing = False
         while not self.stop_event.is_set() and self.is_running:
             try:
                 if not self.server.is_video_server_connected():
+                    if viewing:
+                        camera.remove_viewer()
+                        viewing = False
                     time.sleep(0.1)
                     continue
 
-                if self.robot.camera_manager.switching:
+                if not viewing:
+                    camera.add_viewer()
+                    viewing = True
+
+                if camera.switching:
                     time.sleep(0.02)
                     continue
 
-                frame_data = self.robot.get_camera_frame_encoded(quality=70)
+                frame_data = self.robot.get_camera_frame_encoded()
                 if frame_data is None or len(frame_data) < 100:
                     time.sleep(0.02)
                     continue
@@ -309,6 +323,9 @@ class EVAServer:
                 print(f"⚠️ Erro no vídeo: {e}")
                 time.sleep(0.1)
 
+        if viewing:
+            camera.remove_viewer()
+
     
     def get_status(self) -> dict:
         """Retorna status do servidor"""
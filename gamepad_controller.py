@@ -119,6 +119,7 @@ class GamepadController:
         
         # Thread
         self.running = False
+        self.connected = False  # cai para False quando o _read_loop termina
         self.thread: Optional[threading.Thread] = None
         self._state_lock = threading.Lock()
         
@@ -195,6 +196,7 @@ class GamepadController:
             
             # Iniciar thread
             self.running = True
+            self.connected = True
             self.thread = threading.Thread(target=self._read_loop, daemon=True)
             self.thread.start()
             
@@ -250,6 +252,10 @@ class GamepadController:
         except Exception as e:
             print(f"⚠️  Erro na leitura do gamepad: {e}")
 
+        finally:
+            # Sem leitura o estado congela: não reportar como conectado
+            self.connected = False
+
     
     def _process_event(self, event):
         updated = False
@@ -347,7 +353,12 @@ class GamepadController:
             return 0.0
         
         normalized = (value - center) / range_half
-        return max(-1.0, min(1.0, normalized))
+        # clamp sem chamadas a max/min (roda a cada evento do evdev)
+        if normalized > 1.0:
+            return 1.0
+        if normalized < -1.0:
+            return -1.0
+        return normalized
     
     def _apply_deadzone_and_smoothing(self):
         """Aplica deadzone e smoothing aos sticks"""
@@ -362,7 +373,9 @@ class GamepadController:
         elif left_magnitude > 0:
             # Remapear para compensar deadzone
             scale = (left_magnitude - self.deadzone) / (1.0 - self.deadzone)
-            scale = min(1.0, scale / left_magnitude)
+            scale = scale / left_magnitude
+            if scale > 1.0:
+                scale = 1.0
             self.state.left_x *= scale
             self.state.left_y *= scale
         
@@ -372,7 +385,9 @@ class GamepadController:
             self.state.right_y = 0.0
         elif right_magnitude > 0:
             scale = (right_magnitude - self.deadzone) / (1.0 - self.deadzone)
-            scale = min(1.0, scale / right_magnitude)
+            scale = scale / right_magnitude
+            if scale > 1.0:
+                scale = 1.0
             self.state.right_x *= scale
             self.state.right_y *= scale
         
@@ -404,7 +419,7 @@ class GamepadController:
     
     def is_connected(self) -> bool:
         """Verifica se gamepad está conectado"""
-        return self.running and self.device is not None
+        return self.connected and self.device is not None
     
     def get_info(self) -> Dict:
         """Retorna informações do gamepad"""
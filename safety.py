@@ -121,6 +121,19 @@ class SafetyController:
         
         # Última leitura de sensores
         self.last_sensor_data: Dict = {}
+        # Cópia "achatada" das leituras usadas em validate_drive_command
+        self._ultrasonic_cm: Optional[float] = None
+        self._battery_v: Optional[float] = None
+        
+        # Limites resolvidos uma vez (evita CONFIG.safety.X por comando):
+        # (estop_cm, min_obstacle_cm, critical_v, low_v)
+        limits = CONFIG.safety
+        self._drive_limits = (
+            limits.EMERGENCY_STOP_DISTANCE,
+            limits.MIN_OBSTACLE_DISTANCE,
+            limits.CRITICAL_BATTERY_VOLTAGE,
+            limits.LOW_BATTERY_VOLTAGE,
+        )
         
         print("✅ Safety Controller inicializado")
     
@@ -146,21 +159,23 @@ class SafetyController:
         if self.emergency_stop_active:
             return False, "EMERGENCY STOP ativo"
         
+        estop_cm, min_obstacle_cm, critical_v, low_v = self._drive_limits
+        
         # Verificar se está indo para frente
         if vx > 0:
             # Ler sensor ultrasonic
-            distance = self.last_sensor_data.get('ultrasonic_cm')
+            distance = self._ultrasonic_cm
             
             if distance is not None:
                 # Obstáculo muito próximo
-                if distance < CONFIG.safety.EMERGENCY_STOP_DISTANCE:
+                if distance < estop_cm:
                     self.trigger_emergency_stop(
                         f"Obstáculo crítico: {distance:.1f}cm"
                     )
                     return False, f"Obstáculo muito próximo ({distance:.1f}cm)"
                 
                 # Warning
-                if distance < CONFIG.safety.MIN_OBSTACLE_DISTANCE:
+                if distance < min_obstacle_cm:
                     self.add_warning(
                         SafetyLevel.WARNING,
                         f"Obstáculo detectado: {distance:.1f}cm",
@@ -170,16 +185,16 @@ class SafetyController:
                     return False, f"Obstáculo próximo ({distance:.1f}cm)"
         
         # Verificar bateria
-        battery_v = self.last_sensor_data.get('battery_v')
+        battery_v = self._battery_v
         
         if battery_v is not None:
-            if battery_v < CONFIG.safety.CRITICAL_BATTERY_VOLTAGE:
+            if battery_v < critical_v:
                 self.trigger_emergency_stop(
                     f"Bateria crítica: {battery_v:.1f}V"
                 )
                 return False, f"Bateria crítica ({battery_v:.1f}V)"
             
-            if battery_v < CONFIG.safety.LOW_BATTERY_VOLTAGE:
+            if battery_v < low_v:
                 self.add_warning(
                     SafetyLevel.WARNING,
                     f"Bateria baixa: {battery_v:.1f}V",
@@ -283,6 +298,8 @@ class SafetyController:
             sensor_data: {"ultrasonic_cm": float, "battery_v": float, ...}
         """
         self.last_sensor_data = sensor_data
+        self._ultrasonic_cm = sensor_data.get('ultrasonic_cm')
+        self._battery_v = sensor_data.get('battery_v')
         
         # Verificar bateria
         if 'battery_v' in sensor_data:
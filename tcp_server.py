@@ -14,6 +14,8 @@ class TCPServer:
     def __init__(self):
         self.server_socket = None
         self.client_sockets = {}
+        # índice reverso addr -> socket (send_to_client sem varredura linear)
+        self._sockets_by_addr = {}
         self.message_queue = queue.Queue()
 
         self.max_clients = 1
@@ -74,6 +76,7 @@ class TCPServer:
                 pass
 
         self.client_sockets.clear()
+        self._sockets_by_addr.clear()
         self.active_connections = 0
         print("Server stopped.")
 
@@ -114,7 +117,10 @@ class TCPServer:
 
                         client_socket, addr = s.accept()
                         client_socket.setblocking(False)
+                        # respostas de comando são minúsculas: sem Nagle
+                        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                         self.client_sockets[client_socket] = addr
+                        self._sockets_by_addr[addr] = client_socket
                         self.active_connections += 1
                         print(f"New connection from {addr}, {self.active_connections} active.")
                         continue
@@ -168,17 +174,17 @@ class TCPServer:
                 self._remove_client(s)
 
     def send_to_client(self, client_address, data):
-        for s, addr in self.client_sockets.items():
-            if addr == client_address:
-                try:
-                    if isinstance(data, str):
-                        s.sendall(data.encode("utf-8"))
-                    else:
-                        s.sendall(data)
-                except OSError:
-                    self._remove_client(s)
-                return
-        print(f"Client at {client_address} not found.")
+        s = self._sockets_by_addr.get(client_address)
+        if s is None:
+            print(f"Client at {client_address} not found.")
+            return
+        try:
+            if isinstance(data, str):
+                s.sendall(data.encode("utf-8"))
+            else:
+                s.sendall(data)
+        except OSError:
+            self._remove_client(s)
 
     # ==========================================================
     # UTILS
@@ -194,6 +200,8 @@ class TCPServer:
             pass
         if client_socket in self.client_sockets:
             del self.client_sockets[client_socket]
+            if self._sockets_by_addr.get(addr) is client_socket:
+                del self._sockets_by_addr[addr]
             self.active_connections -= 1
 
     def get_client_ips(self):